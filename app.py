@@ -1,44 +1,159 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import numpy as np
+import os
+import pickle
+import sqlite3
+import functools
+import concurrent.futures
 from datetime import datetime, timedelta
-import plotly.graph_objects as go
 
 # === ATR Percentile Indicator ===
+ATR_MIN_PERIODS = 20
+
+@functools.lru_cache(maxsize=None)
+def _numba_jit(func):
+    """Compile a kernel with numba, or return None if numba is unavailable."""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True)(func)
+
+def _rma(tr, alpha):
+    """
+    Wilder's moving average (Pine Script's RMA) in a single pass.
+    
+    NaN inputs carry the previous value forward.
+    """
+    out = np.empty_like(tr)
+    out[0] = tr[0]
+    for i in range(1, tr.shape[0]):
+        if np.isnan(tr[i]):
+            out[i] = out[i - 1]
+        elif np.isnan(out[i - 1]):
+            out[i] = tr[i]
+        else:
+            out[i] = out[i - 1] + alpha * (tr[i] - out[i - 1])
+    return out
+
+def _rolling_pct_rank(atr, window, min_periods):
+    """
+    Rolling percentile rank of each value within its trailing window.
+    
+    Keeps a sorted buffer of the values currently in the window, so each step
+    costs O(log W) comparisons. NaNs are never inserted into the buffer.
+    """
+    n = atr.shape[0]
+    out = np.full(n, np.nan)
+    buf = np.empty(window)
+    count = 0
+    
+    for i in range(n):
+        # Drop the value leaving the window
+        if i >= window:
+            old = atr[i - window]
+            if not np.isnan(old):
+                pos = np.searchsorted(buf[:count], old)
+                for j in range(pos, count - 1):
+                    buf[j] = buf[j + 1]
+                count -= 1
+        
+        value = atr[i]
+        if np.isnan(value):
+            continue
+        
+        # Insert the new value; its insertion point is the count of values <= it
+        pos = np.searchsorted(buf[:count], value, side='right')
+        for j in range(count, pos, -1):
+            buf[j] = buf[j - 1]
+        buf[pos] = value
+        count += 1
+        
+        if count >= min_periods:
+            out[i] = (pos + 1) / count * 100
+    
+    return out
+
+def _rolling_pct_rank_numpy(atr, window, min_periods):
+    """Vectorized fallback: compare every strided window against its last value."""
+    # Windows are left-padded with NaN so partial windows honour min_periods
+    padded = np.concatenate((np.full(window - 1, np.nan), atr))
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window)
+    current = windows[:, -1:]
+    valid_count = window - np.isnan(windows).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pct = (windows <= current).sum(axis=1) / valid_count * 100
+    pct[(valid_count < min_periods) | np.isnan(atr)] = np.nan
+    return pct
+
+def _rolling_pct_rank_bottleneck(atr, window, min_periods):
+    """
+    C-level fallback built on bottleneck.move_rank.
+    
+    move_rank maps the average rank within the window onto [-1, 1]; undo that
+    scaling to recover the count of values <= the current one. Only tied
+    values differ from the other kernels, where the average rank is used.
+    """
+    import bottleneck as bn
+    
+    # bottleneck rejects windows longer than the data; those are all partial anyway
+    window = min(window, atr.shape[0])
+    if window < min_periods:
+        # Too few bars for any window to reach min_periods (and move_rank
+        # would reject min_count > window)
+        return np.full(atr.shape[0], np.nan)
+    rank = bn.move_rank(atr, window=window, min_count=min_periods)
+    valid_count = bn.move_sum((~np.isnan(atr)).astype(np.float64), window=window, min_count=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        at_or_below = (rank + 1) / 2 * (valid_count - 1) + 1
+        return at_or_below / valid_count * 100
+
+@functools.lru_cache(maxsize=None)
+def _pct_rank_kernel():
+    """Pick the fastest available rolling percentile-rank implementation."""
+    kernel = _numba_jit(_rolling_pct_rank)
+    if kernel is not None:
+        return kernel
+    try:
+        import bottleneck  # noqa: F401
+    except ImportError:
+        return _rolling_pct_rank_numpy
+    return _rolling_pct_rank_bottleneck
+
 def calculate_atr_percentile(df, atr_length=5, lookback_days=126):
     """
     Calculate ATR and its percentile rank over a lookback period.
     
+    Adds 'atr' and 'atr_percentile' columns to df in place and returns it.
+    
     Returns:
     - atr_score: 1 if percentile > 50, else 0
     - atr_percentile: the actual percentile value
     """
-    df = df.copy()
-    
-    # Calculate True Range
-    df['tr1'] = df['High'] - df['Low']
-    df['tr2'] = abs(df['High'] - df['Close'].shift(1))
-    df['tr3'] = abs(df['Low'] - df['Close'].shift(1))
-    df['tr'] = df[['tr1', 'tr2', 'tr3']].max(axis=1)
+    # Calculate True Range (fmax skips the missing previous close on the first bar)
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    close = df['Close'].to_numpy(dtype=np.float64)
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
     
     # Calculate ATR (using EMA for smoothing, similar to Pine Script's RMA)
-    df['atr'] = df['tr'].ewm(alpha=1/atr_length, adjust=False).mean()
+    rma = _numba_jit(_rma)
+    if rma is not None:
+        atr = rma(tr, 1.0 / atr_length)
+    else:
+        atr = pd.Series(tr).ewm(alpha=1/atr_length, adjust=False).mean().to_numpy()
     
     # Calculate percentile rank over rolling window
-    def percentile_rank(series):
-        if len(series) < 20:
-            return np.nan
-        current_value = series.iloc[-1]
-        return (series <= current_value).sum() / len(series) * 100
-    
-    df['atr_percentile'] = df['atr'].rolling(
-        window=lookback_days, 
-        min_periods=20
-    ).apply(percentile_rank, raw=False)
+    kernel = _pct_rank_kernel()
+    atr_percentile = kernel(atr, int(lookback_days), ATR_MIN_PERIODS)
     
-    # Clean up temporary columns
-    df.drop(['tr1', 'tr2', 'tr3', 'tr'], axis=1, inplace=True)
+    # Attach only the output columns, without copying the frame
+    df['atr'] = atr
+    df['atr_percentile'] = atr_percentile
     
     return df
 
@@ -50,9 +165,9 @@ def get_atr_score(df):
     if df is None or len(df) == 0:
         return 0, None, None
     
-    latest = df.iloc[-1]
-    atr_percentile = latest.get('atr_percentile', None)
-    atr_value = latest.get('atr', None)
+    # Read the two scalars directly rather than materializing the last row
+    atr_percentile = df['atr_percentile'].iat[-1]
+    atr_value = df['atr'].iat[-1]
     
     if pd.isna(atr_percentile):
         return 0, None, None
@@ -62,25 +177,95 @@ def get_atr_score(df):
     
     return score, round(atr_percentile, 1), round(atr_value, 4)
 
+# === Data Fetching ===
+DISK_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+DISK_CACHE_TTL = 24 * 60 * 60  # 1 day
+
+class NoDataError(Exception):
+    """yfinance returned no price history (bad ticker, rate limit or network hiccup)."""
+
+# Failures that make the disk cache unusable (read-only dir, locked sqlite file,
+# entries pickled by an older pandas); the disk layer is skipped rather than failing
+_DISK_CACHE_ERRORS = (
+    OSError, sqlite3.Error, pickle.UnpicklingError, EOFError,
+    AttributeError, ImportError, TypeError
+)
+
+@functools.lru_cache(maxsize=None)
+def _disk_cache():
+    """Open the on-disk response cache, or return None if it is unavailable."""
+    try:
+        import diskcache
+        return diskcache.Cache(DISK_CACHE_DIR)
+    except _DISK_CACHE_ERRORS:
+        return None
+
+def _disk_cache_get(key):
+    """Read an entry from the disk cache; any cache failure counts as a miss."""
+    cache = _disk_cache()
+    if cache is None:
+        return None
+    try:
+        return cache.get(key)
+    except _DISK_CACHE_ERRORS:
+        return None
+
+def _disk_cache_set(key, value):
+    """Store an entry in the disk cache, ignoring cache failures."""
+    cache = _disk_cache()
+    if cache is None:
+        return
+    try:
+        cache.set(key, value, expire=DISK_CACHE_TTL)
+    except _DISK_CACHE_ERRORS:
+        pass
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_stock_data(ticker, period='1y'):
+    """
+    Download price history and company info for a ticker.
+    
+    Results are memoized per (ticker, period) by Streamlit and persisted to a
+    disk cache for a day, so reruns and restarts skip the network. Empty
+    results raise NoDataError, which neither cache stores, so they are retried.
+    Returns: (history DataFrame, info dict)
+    """
+    key = (ticker.upper(), period)
+    cached = _disk_cache_get(key)
+    if cached is not None:
+        return cached
+    
+    import yfinance as yf
+    
+    stock = yf.Ticker(ticker)
+    df = stock.history(period=period)
+    if df.empty:
+        raise NoDataError(ticker)
+    
+    info = stock.info
+    _disk_cache_set(key, (df, info))
+    
+    return df, info
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def load_atr_data(ticker, period='1y', atr_length=5, lookback_days=126):
+    """
+    Fetch history and add ATR columns, memoized per input combination.
+    Returns: (DataFrame with atr/atr_percentile, info dict)
+    """
+    df, info = fetch_stock_data(ticker, period)
+    return calculate_atr_percentile(df, atr_length, lookback_days), info
+
 # === Main Analysis Function ===
 def analyze_stock(ticker, period='1y', atr_length=5, lookback_days=126):
     """Complete stock analysis with ATR indicator"""
     try:
-        # Download data
-        stock = yf.Ticker(ticker)
-        df = stock.history(period=period)
-        
-        if df.empty:
-            return None, "Unable to fetch data for this ticker"
-        
-        # Calculate ATR percentile
-        df = calculate_atr_percentile(df, atr_length, lookback_days)
+        # Download data and calculate ATR percentile
+        df, info = load_atr_data(ticker, period, atr_length, lookback_days)
         
         # Get scores
         atr_score, atr_pct, atr_value = get_atr_score(df)
         
-        # Get stock info
-        info = stock.info
         current_price = df['Close'].iloc[-1]
         
         return {
@@ -95,10 +280,179 @@ def analyze_stock(ticker, period='1y', atr_length=5, lookback_days=126):
             'industry': info.get('industry', 'N/A')
         }, None
         
+    except NoDataError:
+        return None, "Unable to fetch data for this ticker"
     except Exception as e:
         return None, f"Error analyzing {ticker}: {str(e)}"
 
+BATCH_MAX_WORKERS = 8
+BATCH_TIMEOUT = 30  # seconds to wait for the whole batch
+
+def analyze_stocks(tickers, period='1y', atr_length=5, lookback_days=126):
+    """
+    Analyze several tickers concurrently (the work is network-bound).
+    Returns: list of (ticker, result, error) in input order
+    """
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS)
+    try:
+        futures = [
+            executor.submit(analyze_stock, ticker, period, atr_length, lookback_days)
+            for ticker in tickers
+        ]
+        # One deadline for the whole batch, not one per ticker
+        _, not_done = concurrent.futures.wait(futures, timeout=BATCH_TIMEOUT)
+        
+        results = []
+        for ticker, future in zip(tickers, futures):
+            if future in not_done:
+                result, error = None, f"Timed out analyzing {ticker}"
+            else:
+                result, error = future.result()
+            results.append((ticker, result, error))
+    finally:
+        # Don't block the page on requests that already timed out
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return results
+
+# === Charts ===
+# Columns sent to the browser for charting; float32 is plenty for a plot
+CHART_COLUMNS = ['Open', 'High', 'Low', 'Close', 'atr_percentile']
+
+_GAUGE_LAYOUT = dict(height=400, margin=dict(l=20, r=20, t=80, b=20))
+_TS_LAYOUT_BASE = dict(
+    xaxis_title="Date",
+    yaxis_title="Percentile (%)",
+    hovermode='x unified',
+    height=500,
+    yaxis=dict(range=[0, 100])
+)
+_PRICE_LAYOUT_BASE = dict(
+    xaxis_title="Date",
+    yaxis_title="Price ($)",
+    hovermode='x unified',
+    height=500,
+    xaxis_rangeslider_visible=False
+)
+
+def _build_gauge(percentile):
+    """Gauge chart for the latest ATR percentile."""
+    import plotly.graph_objects as go
+    
+    fig_gauge = go.Figure(go.Indicator(
+        mode = "gauge+number",
+        value = percentile,
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        title = {'text': "ATR Percentile", 'font': {'size': 24}},
+        gauge = {
+            'axis': {'range': [None, 100], 'tickwidth': 1, 'tickcolor': "darkgray"},
+            'bar': {'color': "darkblue"},
+            'bgcolor': "white",
+            'borderwidth': 2,
+            'bordercolor': "gray",
+            'steps': [
+                {'range': [0, 20], 'color': '#90EE90'},
+                {'range': [20, 40], 'color': '#FFFFE0'},
+                {'range': [40, 60], 'color': '#ADD8E6'},
+                {'range': [60, 80], 'color': '#FFB84D'},
+                {'range': [80, 100], 'color': '#FFB6C1'}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 50
+            }
+        }
+    ))
+    
+    fig_gauge.update_layout(**_GAUGE_LAYOUT)
+    
+    return fig_gauge
+
+def _build_ts_fig(df_plot, atr_length, lookback_days):
+    """ATR percentile history with reference levels and the current value marked."""
+    import plotly.graph_objects as go
+    
+    fig = go.Figure()
+    
+    # ATR Percentile line
+    fig.add_trace(go.Scatter(
+        x=df_plot.index,
+        y=df_plot['atr_percentile'].to_numpy(copy=False),
+        name='ATR Percentile',
+        line=dict(color='#1f77b4', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(31, 119, 180, 0.1)'
+    ))
+    
+    # Reference lines
+    fig.add_hline(y=50, line_dash="dash", line_color="gray", 
+                 annotation_text="50th Percentile", annotation_position="right")
+    fig.add_hline(y=20, line_dash="dot", line_color="green", 
+                 annotation_text="20th (Low)", annotation_position="right")
+    fig.add_hline(y=80, line_dash="dot", line_color="red", 
+                 annotation_text="80th (High)", annotation_position="right")
+    
+    # Highlight current level
+    current_pct = df_plot['atr_percentile'].iloc[-1]
+    fig.add_trace(go.Scatter(
+        x=[df_plot.index[-1]],
+        y=[current_pct],
+        mode='markers',
+        marker=dict(size=12, color='red', symbol='diamond'),
+        name='Current',
+        showlegend=True
+    ))
+    
+    fig.update_layout(
+        title=f"ATR({atr_length}) Percentile - {lookback_days} Day Lookback",
+        **_TS_LAYOUT_BASE
+    )
+    
+    return fig
+
+def _build_price_fig(df_plot, ticker):
+    """Candlestick price chart."""
+    import plotly.graph_objects as go
+    
+    fig_price = go.Figure()
+    
+    # Price candlestick
+    fig_price.add_trace(go.Candlestick(
+        x=df_plot.index,
+        open=df_plot['Open'].to_numpy(copy=False),
+        high=df_plot['High'].to_numpy(copy=False),
+        low=df_plot['Low'].to_numpy(copy=False),
+        close=df_plot['Close'].to_numpy(copy=False),
+        name='Price'
+    ))
+    
+    fig_price.update_layout(title=f"{ticker} Price Chart", **_PRICE_LAYOUT_BASE)
+    
+    return fig_price
+
 # === Streamlit UI ===
+def render_batch_summary(results):
+    """Show one summary row per ticker for multi-ticker analysis."""
+    st.header("📋 Batch Summary")
+    
+    rows = []
+    for ticker, result, error in results:
+        if error:
+            st.warning(f"{ticker}: {error}")
+            continue
+        rows.append({
+            'Ticker': result['ticker'],
+            'Company': result['company_name'],
+            'Price': result['current_price'],
+            'ATR': result['atr_value'],
+            'ATR Percentile': result['atr_percentile'],
+            'Score': result['atr_score']
+        })
+    
+    if rows:
+        st.dataframe(pd.DataFrame(rows).set_index('Ticker'), use_container_width=True)
+
 def main():
     st.set_page_config(
         page_title="ATR Percentile Analyzer",
@@ -113,11 +467,12 @@ def main():
     with st.sidebar:
         st.header("⚙️ Settings")
         
-        ticker = st.text_input(
-            "Stock Ticker", 
+        ticker_input = st.text_input(
+            "Stock Ticker(s)", 
             value="AAPL",
-            help="Enter stock symbol (e.g., AAPL, TSLA, MSFT)"
+            help="Enter a stock symbol, or several separated by commas (e.g., AAPL, TSLA, MSFT)"
         ).upper()
+        tickers = list(dict.fromkeys(t.strip() for t in ticker_input.split(',') if t.strip()))
         
         st.divider()
         
@@ -162,7 +517,14 @@ def main():
         """)
     
     # Main content
-    if analyze_btn or ticker:
+    if analyze_btn or tickers:
+        if len(tickers) > 1:
+            with st.spinner(f"Analyzing {len(tickers)} tickers..."):
+                results = analyze_stocks(tickers, period, atr_length, lookback_days)
+            render_batch_summary(results)
+            return
+        
+        ticker = tickers[0] if tickers else ''
         with st.spinner(f"Analyzing {ticker}..."):
             result, error = analyze_stock(ticker, period, atr_length, lookback_days)
         
@@ -232,36 +594,7 @@ def main():
                 st.divider()
                 
                 # Percentile gauge chart
-                fig_gauge = go.Figure(go.Indicator(
-                    mode = "gauge+number",
-                    value = percentile,
-                    domain = {'x': [0, 1], 'y': [0, 1]},
-                    title = {'text': "ATR Percentile", 'font': {'size': 24}},
-                    gauge = {
-                        'axis': {'range': [None, 100], 'tickwidth': 1, 'tickcolor': "darkgray"},
-                        'bar': {'color': "darkblue"},
-                        'bgcolor': "white",
-                        'borderwidth': 2,
-                        'bordercolor': "gray",
-                        'steps': [
-                            {'range': [0, 20], 'color': '#90EE90'},
-                            {'range': [20, 40], 'color': '#FFFFE0'},
-                            {'range': [40, 60], 'color': '#ADD8E6'},
-                            {'range': [60, 80], 'color': '#FFB84D'},
-                            {'range': [80, 100], 'color': '#FFB6C1'}
-                        ],
-                        'threshold': {
-                            'line': {'color': "red", 'width': 4},
-                            'thickness': 0.75,
-                            'value': 50
-                        }
-                    }
-                ))
-                
-                fig_gauge.update_layout(
-                    height=400,
-                    margin=dict(l=20, r=20, t=80, b=20)
-                )
+                fig_gauge = _build_gauge(percentile)
                 
                 st.plotly_chart(fig_gauge, use_container_width=True)
                 
@@ -275,83 +608,42 @@ def main():
             
             df = result['data']
             
-            # Filter out NaN values for cleaner chart
-            df_plot = df[df['atr_percentile'].notna()].copy()
+            # Skip the warm-up rows before the rolling window reaches its minimum
+            # size (later than ATR_MIN_PERIODS - 1 if early bars are NaN)
+            first_valid = df['atr_percentile'].first_valid_index()
+            if first_valid is None:
+                df_plot = df.iloc[:0]
+            else:
+                df_plot = df.iloc[df.index.get_loc(first_valid):]
             
             if len(df_plot) > 0:
-                fig = go.Figure()
+                # Halve the chart payload; the metrics and raw-data table stay float64
+                df_chart = df_plot[CHART_COLUMNS].astype(np.float32)
                 
-                # ATR Percentile line
-                fig.add_trace(go.Scatter(
-                    x=df_plot.index,
-                    y=df_plot['atr_percentile'],
-                    name='ATR Percentile',
-                    line=dict(color='#1f77b4', width=2),
-                    fill='tozeroy',
-                    fillcolor='rgba(31, 119, 180, 0.1)'
-                ))
-                
-                # Reference lines
-                fig.add_hline(y=50, line_dash="dash", line_color="gray", 
-                             annotation_text="50th Percentile", annotation_position="right")
-                fig.add_hline(y=20, line_dash="dot", line_color="green", 
-                             annotation_text="20th (Low)", annotation_position="right")
-                fig.add_hline(y=80, line_dash="dot", line_color="red", 
-                             annotation_text="80th (High)", annotation_position="right")
-                
-                # Highlight current level
-                current_pct = df_plot['atr_percentile'].iloc[-1]
-                fig.add_trace(go.Scatter(
-                    x=[df_plot.index[-1]],
-                    y=[current_pct],
-                    mode='markers',
-                    marker=dict(size=12, color='red', symbol='diamond'),
-                    name='Current',
-                    showlegend=True
-                ))
-                
-                fig.update_layout(
-                    title=f"ATR({atr_length}) Percentile - {lookback_days} Day Lookback",
-                    xaxis_title="Date",
-                    yaxis_title="Percentile (%)",
-                    hovermode='x unified',
-                    height=500,
-                    yaxis=dict(range=[0, 100])
-                )
+                fig = _build_ts_fig(df_chart, atr_length, lookback_days)
                 
                 st.plotly_chart(fig, use_container_width=True)
                 
                 # === Price Chart with ATR overlay ===
                 st.header("💹 Price Chart")
                 
-                fig_price = go.Figure()
-                
-                # Price candlestick
-                fig_price.add_trace(go.Candlestick(
-                    x=df_plot.index,
-                    open=df_plot['Open'],
-                    high=df_plot['High'],
-                    low=df_plot['Low'],
-                    close=df_plot['Close'],
-                    name='Price'
-                ))
-                
-                fig_price.update_layout(
-                    title=f"{result['ticker']} Price Chart",
-                    xaxis_title="Date",
-                    yaxis_title="Price ($)",
-                    hovermode='x unified',
-                    height=500,
-                    xaxis_rangeslider_visible=False
-                )
+                # Closing-price line by default; the OHLC candlestick payload is opt-in
+                st.line_chart(df_chart[['Close']], use_container_width=True)
                 
-                st.plotly_chart(fig_price, use_container_width=True)
+                with st.expander("🕯️ Candlestick view"):
+                    if st.checkbox("Show candlestick chart"):
+                        fig_price = _build_price_fig(df_chart, result['ticker'])
+                        st.plotly_chart(fig_price, use_container_width=True)
                 
                 # === Data Table ===
                 with st.expander("📊 View Raw Data"):
-                    display_df = df_plot[['Close', 'atr', 'atr_percentile']].tail(50).copy()
-                    display_df.columns = ['Close Price', 'ATR', 'ATR Percentile']
-                    display_df = display_df.iloc[::-1]  # Reverse to show most recent first
+                    recent = df_plot[['Close', 'atr', 'atr_percentile']].tail(50)
+                    # Reverse the raw values to show most recent first
+                    display_df = pd.DataFrame(
+                        recent.to_numpy()[::-1],
+                        index=recent.index[::-1],
+                        columns=['Close Price', 'ATR', 'ATR Percentile']
+                    )
                     st.dataframe(display_df, use_container_width=True)
             
             else: